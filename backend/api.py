@@ -1,17 +1,86 @@
-from fastapi import FastAPI, UploadFile, File, Form, Response
+from fastapi import FastAPI, UploadFile, File, Form, Header, Response
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from typing import Dict, Optional
+from anyio import to_thread
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
 import asyncio
+import hashlib
 import uuid
 import os
-import tempfile
 
-from extraction_service import ExtractionService
+import orjson
+
+from extraction_service import ExtractionService, UpstreamBusyError
+from job_store import JobStore
 from prompt_clinical_extraction import CATEGORIES
 
-app = FastAPI(title="Medical AI Scribe API", version="1.0.0", root_path="/demo/medscribe")
+
+def _public_attrs(obj) -> Dict[str, Any]:
+    return {k: v for k, v in vars(obj).items() if not k.startswith("_")}
+
+
+def _resolve_dumper(cls: type) -> Callable[[Any], Any]:
+    # Objects from SDKs (pydantic-like or simple attribute containers)
+    if callable(getattr(cls, "model_dump", None)):
+        return cls.model_dump
+    if callable(getattr(cls, "dict", None)):
+        return cls.dict
+    if issubclass(cls, (set, frozenset)):
+        return list
+    return _public_attrs
+
+
+# Converter per type, so the attribute probing runs once per SDK class rather
+# than once per object (Whisper returns hundreds of segments)
+_DUMP_CACHE: Dict[type, Callable[[Any], Any]] = {}
+
+
+def _orjson_default(obj):
+    """Convert SDK objects (e.g., OpenAI TranscriptionSegment) that orjson cannot serialize natively."""
+    cls = type(obj)
+    dump = _DUMP_CACHE.get(cls)
+    if dump is None:
+        dump = _DUMP_CACHE[cls] = _resolve_dumper(cls)
+    try:
+        return dump(obj)
+    except Exception:
+        # Last resort: string representation
+        return str(obj)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered by orjson, with a fallback hook for SDK objects."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Size the AnyIO worker pool used for sync handlers, upload file I/O and
+    # StaticFiles (Starlette's default is 40 threads per worker)
+    to_thread.current_default_thread_limiter().total_tokens = int(os.getenv("THREADPOOL_SIZE", "16"))
+    yield
+
+
+# Uvicorn entry point guidance: the workload is dominated by upstream HTTP calls,
+# so production runs several workers on uvloop/httptools, e.g.
+#   uvicorn api:app --app-dir backend --workers 4 --loop uvloop --http httptools \
+#       --limit-concurrency 256 --timeout-keep-alive 15
+# (see the Dockerfile / `make backend-prod`). With more than one worker, set
+# REDIS_URL so job status is shared. OPENAI_MAX_INFLIGHT, CLAUDE_MAX_INFLIGHT,
+# OPENAI_TRANSCRIBE_MAX_INFLIGHT and THREADPOOL_SIZE are per worker, so the
+# service-wide limit is that value times the worker count.
+app = FastAPI(
+    title="Medical AI Scribe API",
+    version="1.0.0",
+    root_path="/demo/medscribe",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # CORS for local Next.js dev server
 app.add_middleware(
@@ -25,50 +94,46 @@ app.add_middleware(
         "http://127.0.0.1:8094",
     ],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "OPTIONS"],
+    allow_headers=["Content-Type", "Authorization"],
+    # Let browsers reuse preflight results for a day
+    max_age=86400,
 )
 
-# Serve project assets (logos) under /assets
-# This maps to the repository root so the existing logo files are accessible.
-app.mount("/assets", StaticFiles(directory="."), name="assets")
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that lets browsers and CDNs cache assets for `max_age` seconds."""
 
-# Initialize service
-extraction_service = ExtractionService()
+    def __init__(self, *args, max_age: int = 31536000, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_control = f"public, max-age={max_age}, immutable"
 
-# In-memory status tracking for mock jobs (retained for backward compatibility)
-processing_jobs: Dict[str, Dict] = {}
+    def file_response(self, full_path, stat_result, scope, status_code=200) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        response.headers["Cache-Control"] = self.cache_control
+        return response
 
 
-def _to_jsonable(obj):
-    """Recursively convert SDK objects (e.g., OpenAI TranscriptionSegment) into JSON-serializable primitives."""
-    import collections.abc
+# Serve project assets (logos) under /assets from backend/assets only
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+app.mount(
+    "/assets",
+    CachedStaticFiles(directory=ASSETS_DIR, max_age=int(os.getenv("ASSETS_MAX_AGE", "31536000"))),
+    name="assets",
+)
 
-    # Primitive types
-    if obj is None or isinstance(obj, (bool, int, float, str)):
-        return obj
+# Initialize service
+extraction_service = ExtractionService()
 
-    # Collections
-    if isinstance(obj, (list, tuple, set)):
-        return [_to_jsonable(x) for x in obj]
+# /health is hit constantly by probes and never changes, so encode it once
+_HEALTH_BODY = orjson.dumps({"status": "healthy", "service": "Medical AI Scribe"})
 
-    if isinstance(obj, dict):
-        return {str(k): _to_jsonable(v) for k, v in obj.items()}
+# /categories is static: serialize it once and let clients revalidate via ETag
+_CATEGORIES_BODY = orjson.dumps({"categories": CATEGORIES})
+_CATEGORIES_ETAG = f'"{hashlib.blake2b(_CATEGORIES_BODY, digest_size=8).hexdigest()}"'
 
-    # Objects from SDKs (pydantic-like or simple attribute containers)
-    try:
-        if hasattr(obj, "model_dump") and callable(getattr(obj, "model_dump")):
-            return _to_jsonable(obj.model_dump())
-        if hasattr(obj, "dict") and callable(getattr(obj, "dict")):
-            return _to_jsonable(obj.dict())
-        # Fallback to public attributes
-        return _to_jsonable({k: v for k, v in vars(obj).items() if not k.startswith("_")})
-    except Exception:
-        # Last resort: string representation
-        try:
-            return str(obj)
-        except Exception:
-            return None
+# Status tracking for mock jobs (retained for backward compatibility).
+# Set REDIS_URL so every worker sees the same jobs.
+processing_jobs = JobStore()
 
 
 class TranscriptController:
@@ -81,93 +146,110 @@ class TranscriptController:
         options = request_data.get("options", {})
 
         if not transcript:
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=400,
                 content={"success": False, "error": "Missing transcript text."}
             )
 
-        result = await extraction_service.process_transcript(transcript, options)
-        return JSONResponse(content=result)
+        try:
+            result = await extraction_service.process_transcript(transcript, options)
+        except UpstreamBusyError:
+            return ORJSONResponse(
+                status_code=503,
+                content={"success": False, "error": "Extraction service is busy. Please try again."}
+            )
+        except asyncio.TimeoutError:
+            return ORJSONResponse(
+                status_code=504,
+                content={"success": False, "error": "Clinical data extraction timed out. Please try again."}
+            )
+        return ORJSONResponse(content=result)
 
     @staticmethod
     async def transcribe_audio(
         file: UploadFile = File(...),
         language: Optional[str] = Form(None),
-        deleteAfterTranscription: Optional[bool] = Form(False),
+        deleteAfterTranscription: Optional[bool] = Form(True, deprecated=True),
     ):
-        """POST /api/transcript/transcribe — Transcribe audio to text using OpenAI Whisper API."""
+        """POST /api/transcript/transcribe — Transcribe audio to text using OpenAI Whisper API.
+
+        The upload is streamed to OpenAI without being written to disk by this service;
+        `deleteAfterTranscription` is accepted for backward compatibility only.
+        """
         try:
             # Check if OpenAI API key is available
             if not os.getenv("OPENAI_API_KEY"):
                 raise RuntimeError("OPENAI_API_KEY not configured. Audio transcription requires OpenAI API access.")
 
-            # Save uploaded file to a temporary location
             if not file:
-                return JSONResponse(status_code=400, content={"success": False, "error": "No file uploaded"})
+                return ORJSONResponse(status_code=400, content={"success": False, "error": "No file uploaded"})
 
-            suffix = os.path.splitext(file.filename or "audio")[1] or ".mp3"
-            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-                temp_path = tmp.name
-                content = await file.read()
-                tmp.write(content)
+            # Hand the spooled upload straight to the SDK instead of copying it to disk
+            audio_stream = file.file
+            size = file.size
+            if size is None:
+                audio_stream.seek(0, os.SEEK_END)
+                size = audio_stream.tell()
+            audio_stream.seek(0)
 
-            # Check if file exists
-            if not os.path.exists(temp_path):
-                raise FileNotFoundError("Audio file not found")
-
-            # Get file size
-            file_size_mb = os.path.getsize(temp_path) / (1024 * 1024)
+            file_size_mb = size / (1024 * 1024)
             if file_size_mb > 25:
-                # Clean up temp file before raising
-                try:
-                    os.unlink(temp_path)
-                except Exception:
-                    pass
                 raise ValueError("Audio file is too large. Maximum size is 25MB.")
 
-            print(f"Transcribing audio file: {os.path.basename(temp_path)} ({file_size_mb:.2f} MB)")
+            # Whisper infers the format from the extension; keep the old .mp3 default
+            filename = file.filename or "audio"
+            if not os.path.splitext(filename)[1]:
+                filename += ".mp3"
+
+            print(f"Transcribing audio file: {filename} ({file_size_mb:.2f} MB)")
 
             # Use ExtractionService's OpenAI client
             client = extraction_service.openai_client
             if client is None:
                 raise RuntimeError("OpenAI client not initialized.")
 
-            # Open a stream for the audio file
-            with open(temp_path, "rb") as audio_stream:
-                transcription = client.audio.transcriptions.create(
-                    file=audio_stream,
-                    model=os.getenv("OPENAI_TRANSCRIBE_MODEL", "whisper-1"),
-                    language=language or "en",
-                    response_format="verbose_json",
-                    prompt=(
-                        "This is a medical consultation between a doctor and patient. "
-                        "Please transcribe accurately including medical terminology."
-                    ),
-                )
-
-            # Delete temp file if requested (default false per signature)
-            if deleteAfterTranscription:
-                try:
-                    os.unlink(temp_path)
-                except Exception:
-                    pass
-
-            # Prepare response
-            return JSONResponse(
+            transcription = await extraction_service.call_upstream(
+                extraction_service.transcribe_semaphore,
+                client.audio.transcriptions.create,
+                call_timeout=extraction_service.transcribe_timeout,
+                file=(filename, audio_stream, file.content_type or "application/octet-stream"),
+                model=os.getenv("OPENAI_TRANSCRIBE_MODEL", "whisper-1"),
+                language=language or "en",
+                response_format="verbose_json",
+                prompt=(
+                    "This is a medical consultation between a doctor and patient. "
+                    "Please transcribe accurately including medical terminology."
+                ),
+            )
+
+            # Prepare response; segments are serialized by orjson via _orjson_default
+            return ORJSONResponse(
                 content={
                     "success": True,
                     "transcript": getattr(transcription, "text", None),
                     "duration": getattr(transcription, "duration", None),
                     "language": getattr(transcription, "language", language or "en"),
-                    "segments": _to_jsonable(getattr(transcription, "segments", None)),
+                    "segments": getattr(transcription, "segments", None),
                     "metadata": {
                         "fileSize": f"{file_size_mb:.2f} MB",
-                        "processedAt": __import__("datetime").datetime.utcnow().isoformat() + "Z",
+                        "processedAt": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
                         "model": os.getenv("OPENAI_TRANSCRIBE_MODEL", "whisper-1"),
                     },
                 }
             )
 
+        except UpstreamBusyError:
+            print("Transcription timed out waiting for an OpenAI request slot")
+            return ORJSONResponse(
+                status_code=503,
+                content={"success": False, "error": "Transcription service is busy. Please try again."}
+            )
+        except asyncio.TimeoutError:
+            print("Transcription timed out waiting for OpenAI")
+            return ORJSONResponse(
+                status_code=504,
+                content={"success": False, "error": "Audio transcription timed out. Please try again."}
+            )
         except Exception as error:  # Map to detailed error messages
             print("Transcription error:", error)
 
@@ -184,41 +266,47 @@ class TranscriptController:
                 message = "Audio file is too large for transcription."
             elif status == 415:
                 message = "Unsupported audio format. Please use MP3, MP4, MPEG, MPGA, M4A, WAV, or WEBM."
-            elif isinstance(error, FileNotFoundError):
-                message = str(error)
             elif isinstance(error, ValueError):
                 message = str(error)
             else:
                 message = f"Failed to transcribe audio: {str(error)}"
 
-            return JSONResponse(status_code=400, content={"success": False, "error": message})
+            return ORJSONResponse(status_code=400, content={"success": False, "error": message})
 
     @staticmethod
     async def get_processing_status(processing_id: str):
         """GET /api/transcript/status/{processing_id} — Check transcription job status."""
-        job = processing_jobs.get(processing_id)
+        job = await processing_jobs.get(processing_id)
         if not job:
-            return JSONResponse(status_code=404, content={"error": "Processing ID not found."})
-        return JSONResponse(content=job)
+            return ORJSONResponse(status_code=404, content={"error": "Processing ID not found."})
+        return ORJSONResponse(content=job)
 
     @staticmethod
     async def health_check():
         """GET /api/transcript/health — API health check."""
-        return JSONResponse(content={"status": "healthy", "service": "Medical AI Scribe"})
+        return Response(content=_HEALTH_BODY, media_type="application/json")
 
     @staticmethod
-    async def get_categories():
+    async def get_categories(if_none_match: Optional[str] = None):
         """GET /api/transcript/categories — List available extraction categories."""
-        return JSONResponse(content={"categories": CATEGORIES})
+        headers = {"ETag": _CATEGORIES_ETAG}
+        if if_none_match:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            if "*" in tags or _CATEGORIES_ETAG in tags:
+                return Response(status_code=304, headers=headers)
+        return Response(content=_CATEGORIES_BODY, media_type="application/json", headers=headers)
 
     @staticmethod
     async def _simulate_transcription(processing_id: str):
         """Simulate background transcription (mock)."""
         await asyncio.sleep(3)
-        processing_jobs[processing_id]["status"] = "completed"
-        processing_jobs[processing_id]["transcript"] = (
-            "Doctor: Hello, how are you today? "
-            "Patient: I've had chest pain for two days..."
+        await processing_jobs.update(
+            processing_id,
+            status="completed",
+            transcript=(
+                "Doctor: Hello, how are you today? "
+                "Patient: I've had chest pain for two days..."
+            ),
         )
 
 @app.post("/api/transcript/process")
@@ -227,7 +315,7 @@ async def process_transcript(request_data: Dict):
 
 
 @app.post("/api/transcript/transcribe")
-async def transcribe_audio(file: UploadFile = File(...), language: Optional[str] = Form(None), deleteAfterTranscription: Optional[bool] = Form(False)):
+async def transcribe_audio(file: UploadFile = File(...), language: Optional[str] = Form(None), deleteAfterTranscription: Optional[bool] = Form(True, deprecated=True)):
     return await TranscriptController.transcribe_audio(file, language, deleteAfterTranscription)
 
 
@@ -242,5 +330,5 @@ async def health_check():
 
 
 @app.get("/api/transcript/categories")
-async def get_categories():
-    return await TranscriptController.get_categories()
+async def get_categories(if_none_match: Optional[str] = Header(None)):
+    return await TranscriptController.get_categories(if_none_match)
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import re
 import json
@@ -5,7 +6,7 @@ import datetime
 from typing import Any, Dict, List, Optional
 
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
 import anthropic
 
 from prompt_clinical_extraction import CLINICAL_EXTRACTION_PROMPT, CATEGORIES
@@ -13,6 +14,20 @@ from prompt_clinical_extraction import CLINICAL_EXTRACTION_PROMPT, CATEGORIES
 # Load environment variables from .env
 load_dotenv()
 
+# Split the template once so each request only concatenates around the transcript
+assert CLINICAL_EXTRACTION_PROMPT.count("{{TRANSCRIPT}}") == 1, "prompt must contain exactly one {{TRANSCRIPT}}"
+_PROMPT_PREFIX, _PROMPT_SUFFIX = CLINICAL_EXTRACTION_PROMPT.split("{{TRANSCRIPT}}", 1)
+
+# Line breaks/tabs become spaces and any whitespace run collapses to one space
+_WHITESPACE_RE = re.compile(r"[ \t\r\n]{2,}|[\t\r\n]")
+
+_EXTRACTION_RE = re.compile(r"=== CLINICAL DATA EXTRACTION ===([\s\S]*?)=== END OF EXTRACTION ===")
+
+
+class UpstreamBusyError(Exception):
+    """No upstream slot freed up within the queue timeout."""
+
+
 class ExtractionService:
     def __init__(self):
         self.categories = CATEGORIES
@@ -23,12 +38,25 @@ class ExtractionService:
         self.openai_client = None
         self.claude_client = None
 
+        # Cap in-flight upstream requests so bursts queue here instead of
+        # surfacing as provider rate limits
+        self.openai_semaphore = asyncio.Semaphore(int(os.getenv("OPENAI_MAX_INFLIGHT", "8")))
+        self.claude_semaphore = asyncio.Semaphore(int(os.getenv("CLAUDE_MAX_INFLIGHT", "8")))
+        # Whisper gets its own slots so long uploads cannot starve /process
+        self.transcribe_semaphore = asyncio.Semaphore(int(os.getenv("OPENAI_TRANSCRIBE_MAX_INFLIGHT", "4")))
+        # Waiting for a slot and the upstream call itself are timed separately,
+        # so "busy" is only reported when this service is actually saturated
+        self.queue_timeout = float(os.getenv("UPSTREAM_QUEUE_TIMEOUT_SECONDS", "30"))
+        self.upstream_timeout = float(os.getenv("UPSTREAM_TIMEOUT_SECONDS", "120"))
+        # Whisper on a long (up to 25 MB) recording can take minutes; match the SDK's 600 s default
+        self.transcribe_timeout = float(os.getenv("TRANSCRIBE_TIMEOUT_SECONDS", "600"))
+
         if self.openai_key:
-            self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+            self.openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
             print("OpenAI API initialized")
 
         if self.claude_key:
-            self.claude_client = anthropic.Anthropic(api_key=self.claude_key)
+            self.claude_client = anthropic.AsyncAnthropic(api_key=self.claude_key)
             print("Claude API initialized as fallback")
 
         if not self.openai_key and not self.claude_key:
@@ -63,11 +91,14 @@ class ExtractionService:
                 }
             }
 
+        except (UpstreamBusyError, asyncio.TimeoutError):
+            # Let the API layer report these as 503 / 504 so clients can retry
+            raise
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e),
-                "metadata": {"processedAt": datetime.datetime.utcnow().isoformat()}
+                "metadata": {"processedAt": datetime.datetime.now(datetime.UTC).isoformat()}
             }
 
     # -------------------------------
@@ -75,21 +106,38 @@ class ExtractionService:
     # -------------------------------
 
     def clean_transcript(self, transcript: str) -> str:
-        return (
-            transcript.strip()
-            .replace("\n", " ")
-            .replace("\r", " ")
-            .replace("\t", " ")
-            .replace("  ", " ")
-        )[:50000]
+        return _WHITESPACE_RE.sub(" ", transcript.strip())[:50000]
 
     def generate_prompt(self, transcript: str) -> str:
-        return CLINICAL_EXTRACTION_PROMPT.replace("{{TRANSCRIPT}}", transcript)
+        return f"{_PROMPT_PREFIX}{transcript}{_PROMPT_SUFFIX}"
 
     # -------------------------------
     # Extraction Methods
     # -------------------------------
 
+    async def call_upstream(
+        self,
+        semaphore: asyncio.Semaphore,
+        create,
+        call_timeout: Optional[float] = None,
+        **kwargs,
+    ):
+        """Await an SDK call under `semaphore`.
+
+        Raises UpstreamBusyError if no slot frees up within the queue timeout,
+        and asyncio.TimeoutError if the call itself exceeds `call_timeout`
+        (default: the upstream timeout).
+        """
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise UpstreamBusyError("Timed out waiting for an upstream request slot") from None
+
+        try:
+            return await asyncio.wait_for(create(**kwargs), timeout=self.upstream_timeout if call_timeout is None else call_timeout)
+        finally:
+            semaphore.release()
+
     async def extract_clinical_data(self, prompt: str, options: Dict[str, Any]) -> str:
         if options.get("mockResponse"):
             return self.generate_mock_response()
@@ -111,20 +159,26 @@ class ExtractionService:
 
     async def extract_with_openai(self, prompt: str) -> str:
         print("Sending request to OpenAI API...")
-        response = self.openai_client.chat.completions.create(model=os.getenv("OPENAI_MODEL", "gpt-4o"),
-        messages=[
-            {"role": "system", "content": "You are a medical AI scribe assistant."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.1,
-        max_tokens=4000)
+        response = await self.call_upstream(
+            self.openai_semaphore,
+            self.openai_client.chat.completions.create,
+            model=os.getenv("OPENAI_MODEL", "gpt-4o"),
+            messages=[
+                {"role": "system", "content": "You are a medical AI scribe assistant."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.1,
+            max_tokens=4000
+        )
         content = response.choices[0].message.content
         print("✅ Successfully received response from OpenAI API")
         return content
 
     async def extract_with_claude(self, prompt: str) -> str:
         print("Sending request to Claude API...")
-        response = self.claude_client.messages.create(
+        response = await self.call_upstream(
+            self.claude_semaphore,
+            self.claude_client.messages.create,
             model="claude-3-5-sonnet-20241022",
             max_tokens=4000,
             temperature=0.1,
@@ -140,10 +194,7 @@ class ExtractionService:
 
     def structure_output(self, raw_output: str) -> Dict[str, Any]:
         structure = {"categories": [], "summary": {}}
-        match = re.search(
-            r"=== CLINICAL DATA EXTRACTION ===([\s\S]*?)=== END OF EXTRACTION ===",
-            raw_output
-        )
+        match = _EXTRACTION_RE.search(raw_output)
         if match:
             structure["categories"] = self.parse_section(match.group(1))
 
@@ -155,19 +206,27 @@ class ExtractionService:
         return structure
 
     def parse_section(self, section: str) -> List[Dict[str, Any]]:
-        lines = [l.strip() for l in section.splitlines() if l.strip()]
         data_points = []
         current_item = None
 
-        for line in lines:
-            if re.match(r"^\d+\.", line):
-                if current_item:
-                    data_points.append(current_item)
-                current_item = {
-                    "category": re.sub(r"^\d+\.\s*", "", line).rstrip(":"),
-                    "details": []
-                }
-            elif line.startswith("-") and current_item:
+        for line in section.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+
+            # "<digits>." starts a new category; "-" lines are its details
+            if line[0].isdecimal():
+                end = 1
+                while end < len(line) and line[end].isdecimal():
+                    end += 1
+                if end < len(line) and line[end] == ".":
+                    if current_item:
+                        data_points.append(current_item)
+                    current_item = {
+                        "category": line[end + 1:].lstrip().rstrip(":"),
+                        "details": []
+                    }
+            elif line[0] == "-" and current_item:
                 current_item["details"].append(line[1:].strip())
 
         if current_item:
@@ -221,7 +280,6 @@ class ExtractionService:
 # -------------------------------
 
 if __name__ == "__main__":
-    import asyncio
     from sample_transcript import sample_transcript
 
     async def main():
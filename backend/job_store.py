@@ -0,0 +1,104 @@
+import os
+import json
+import time
+from typing import Any, Dict, Optional
+
+
+# HSET + EXPIRE only if the job still exists, so an update racing the TTL
+# cannot recreate a partial hash
+_UPDATE_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+
+class JobStore:
+    """Processing-job state shared across Uvicorn workers.
+
+    Backed by Redis when REDIS_URL is set, otherwise by a process-local dict
+    (fine for a single worker / local dev). Either way, a job expires
+    JOB_TTL_SECONDS after its last write.
+    """
+
+    KEY_PREFIX = "processing_jobs:"
+
+    def __init__(self, redis_url: Optional[str] = None, ttl_seconds: Optional[int] = None):
+        self.redis_url = redis_url or os.getenv("REDIS_URL")
+        if ttl_seconds is None:
+            ttl_seconds = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+        self.ttl_seconds = ttl_seconds
+
+        self._redis = None
+        self._update_script = None
+        self._memory: Dict[str, Dict[str, Any]] = {}
+        self._expires_at: Dict[str, float] = {}
+
+        if self.redis_url:
+            import redis.asyncio as redis
+
+            self._redis = redis.from_url(self.redis_url, decode_responses=True)
+            self._update_script = self._redis.register_script(_UPDATE_IF_EXISTS)
+            print("Job store using Redis")
+        elif int(os.getenv("WEB_CONCURRENCY", "1") or "1") > 1:
+            print(
+                "⚠️ WEB_CONCURRENCY > 1 without REDIS_URL: each worker keeps its own jobs, "
+                "so status requests may 404. Set REDIS_URL to share job state."
+            )
+
+    def _key(self, job_id: str) -> str:
+        return f"{self.KEY_PREFIX}{job_id}"
+
+    def _purge_expired(self) -> None:
+        """Drop in-memory jobs past their TTL, including ones nobody polls."""
+        now = time.monotonic()
+        for job_id in [j for j, expires_at in self._expires_at.items() if expires_at <= now]:
+            self._memory.pop(job_id, None)
+            self._expires_at.pop(job_id, None)
+
+    async def set(self, job_id: str, job: Dict[str, Any]) -> None:
+        if self._redis is None:
+            self._purge_expired()
+            self._memory[job_id] = dict(job)
+            self._expires_at[job_id] = time.monotonic() + self.ttl_seconds
+            return
+
+        key = self._key(job_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.hset(key, mapping={k: json.dumps(v) for k, v in job.items()})
+            pipe.expire(key, self.ttl_seconds)
+            await pipe.execute()
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if self._redis is None:
+            if self._expires_at.get(job_id, 0.0) <= time.monotonic():
+                self._memory.pop(job_id, None)
+                self._expires_at.pop(job_id, None)
+                return None
+            job = self._memory.get(job_id)
+            return dict(job) if job is not None else None
+
+        raw = await self._redis.hgetall(self._key(job_id))
+        if not raw:
+            return None
+        return {k: json.loads(v) for k, v in raw.items()}
+
+    async def update(self, job_id: str, **fields: Any) -> None:
+        """Merge `fields` into an existing job; unknown or expired jobs are ignored."""
+        if not fields:
+            return
+
+        if self._redis is None:
+            if await self.get(job_id) is not None:
+                self._memory[job_id].update(fields)
+                self._expires_at[job_id] = time.monotonic() + self.ttl_seconds
+            return
+
+        args = [self.ttl_seconds]
+        for k, v in fields.items():
+            args += [k, json.dumps(v)]
+        await self._update_script(keys=[self._key(job_id)], args=args)
@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from extraction_service import UpstreamBusyError
+
+
+@pytest.fixture
+def client():
+    with TestClient(api.app) as client:
+        yield client
+
+
+class _FakeTranscriptions:
+    def __init__(self, create):
+        self.create = create
+
+
+class _FakeOpenAI:
+    def __init__(self, create):
+        self.audio = type("Audio", (), {"transcriptions": _FakeTranscriptions(create)})()
+
+
+@pytest.fixture
+def fake_whisper(monkeypatch):
+    def install(create):
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        monkeypatch.setattr(api.extraction_service, "openai_client", _FakeOpenAI(create))
+    return install
+
+
+def _upload(client):
+    return client.post(
+        "/api/transcript/transcribe",
+        files={"file": ("visit.mp3", b"audio-bytes", "audio/mpeg")},
+    )
+
+
+@pytest.mark.parametrize(
+    "error, status",
+    [(UpstreamBusyError("no slot"), 503), (asyncio.TimeoutError(), 504)],
+)
+def test_process_maps_upstream_errors(client, monkeypatch, error, status):
+    async def fail(transcript, options):
+        raise error
+
+    monkeypatch.setattr(api.extraction_service, "process_transcript", fail)
+    response = client.post("/api/transcript/process", json={"transcript": "hello"})
+    assert response.status_code == status
+    assert response.json()["success"] is False
+
+
+def test_transcribe_busy_maps_to_503(client, monkeypatch, fake_whisper):
+    async def create(**kwargs):
+        return None
+
+    fake_whisper(create)
+    monkeypatch.setattr(api.extraction_service, "queue_timeout", 0.01)
+    monkeypatch.setattr(api.extraction_service, "transcribe_semaphore", asyncio.Semaphore(0))
+    response = _upload(client)
+    assert response.status_code == 503
+    assert "busy" in response.json()["error"]
+
+
+def test_transcribe_timeout_maps_to_504(client, monkeypatch, fake_whisper):
+    async def create(**kwargs):
+        await asyncio.Event().wait()
+
+    fake_whisper(create)
+    monkeypatch.setattr(api.extraction_service, "transcribe_timeout", 0.01)
+    response = _upload(client)
+    assert response.status_code == 504
+    assert "timed out" in response.json()["error"]
+
+
+def test_transcribe_uses_transcription_slots(client, monkeypatch, fake_whisper):
+    async def create(**kwargs):
+        return type("Transcription", (), {"text": "hi", "duration": 1.0, "language": "en", "segments": []})()
+
+    fake_whisper(create)
+    # Extraction slots exhausted must not block transcription
+    monkeypatch.setattr(api.extraction_service, "queue_timeout", 0.01)
+    monkeypatch.setattr(api.extraction_service, "openai_semaphore", asyncio.Semaphore(0))
+    response = _upload(client)
+    assert response.status_code == 200
+    assert response.json()["transcript"] == "hi"
+
+
+def test_categories_sends_etag(client):
+    response = client.get("/api/transcript/categories")
+    assert response.status_code == 200
+    assert response.headers["etag"] == api._CATEGORIES_ETAG
+    assert response.json() == {"categories": api.CATEGORIES}
+
+
+@pytest.mark.parametrize(
+    "if_none_match",
+    [api._CATEGORIES_ETAG, f"W/{api._CATEGORIES_ETAG}", "*", f'"other", {api._CATEGORIES_ETAG}'],
+)
+def test_categories_not_modified(client, if_none_match):
+    response = client.get("/api/transcript/categories", headers={"If-None-Match": if_none_match})
+    assert response.status_code == 304
+    assert response.headers["etag"] == api._CATEGORIES_ETAG
+    assert response.content == b""
+
+
+def test_categories_stale_etag_gets_full_body(client):
+    response = client.get("/api/transcript/categories", headers={"If-None-Match": '"stale"'})
+    assert response.status_code == 200
+    assert response.json() == {"categories": api.CATEGORIES}
@@ -0,0 +1,129 @@
+import asyncio
+import re
+
+import pytest
+
+from extraction_service import ExtractionService, UpstreamBusyError
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.delenv("CLAUDE_API_KEY", raising=False)
+    return ExtractionService()
+
+
+async def _hang(**kwargs):
+    await asyncio.Event().wait()
+
+
+async def _echo(**kwargs):
+    return kwargs
+
+
+def test_call_upstream_passes_kwargs_and_releases_slot(service):
+    async def run():
+        semaphore = asyncio.Semaphore(1)
+        result = await service.call_upstream(semaphore, _echo, model="m")
+        return result, semaphore.locked()
+
+    result, locked = asyncio.run(run())
+    assert result == {"model": "m"}
+    assert not locked
+
+
+def test_call_upstream_busy_when_no_slot_frees_up(service):
+    service.queue_timeout = 0.01
+
+    async def run():
+        semaphore = asyncio.Semaphore(0)
+        with pytest.raises(UpstreamBusyError):
+            await service.call_upstream(semaphore, _echo)
+
+    asyncio.run(run())
+
+
+def test_call_upstream_timeout_releases_slot(service):
+    async def run():
+        semaphore = asyncio.Semaphore(1)
+        with pytest.raises(asyncio.TimeoutError):
+            await service.call_upstream(semaphore, _hang, call_timeout=0.01)
+        return semaphore.locked()
+
+    assert asyncio.run(run()) is False
+
+
+def test_call_upstream_honours_explicit_zero_timeout(service):
+    service.upstream_timeout = 60
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await service.call_upstream(asyncio.Semaphore(1), _hang, call_timeout=0)
+
+    asyncio.run(run())
+
+
+def test_transcription_has_its_own_semaphore(service):
+    assert service.transcribe_semaphore is not service.openai_semaphore
+
+
+@pytest.mark.parametrize(
+    "raw, cleaned",
+    [
+        ("a\tb", "a b"),
+        ("a\r\nb", "a b"),
+        ("a  b", "a b"),
+        ("b   c", "b c"),
+        ("a \n  b", "a b"),
+        ("  Doctor: hi\n\nPatient: ok  ", "Doctor: hi Patient: ok"),
+    ],
+)
+def test_clean_transcript_collapses_whitespace(service, raw, cleaned):
+    assert service.clean_transcript(raw) == cleaned
+
+
+def test_clean_transcript_truncates_to_50000_chars(service):
+    cleaned = service.clean_transcript("word " * 20000)
+    assert len(cleaned) == 50000
+    assert cleaned.startswith("word word")
+
+
+def _baseline_parse_section(section):
+    """The original regex-based parse_section, kept as the reference behaviour."""
+    lines = [l.strip() for l in section.splitlines() if l.strip()]
+    data_points = []
+    current_item = None
+    for line in lines:
+        if re.match(r"^\d+\.", line):
+            if current_item:
+                data_points.append(current_item)
+            current_item = {"category": re.sub(r"^\d+\.\s*", "", line).rstrip(":"), "details": []}
+        elif line.startswith("-") and current_item:
+            current_item["details"].append(line[1:].strip())
+    if current_item:
+        data_points.append(current_item)
+    return data_points
+
+
+@pytest.mark.parametrize(
+    "section",
+    [
+        "1. Chief Complaint:\n   - chest pain\n2. HPI:\n - onset 2 days",
+        "12.  Plan::\n-follow up\n",
+        "1a. not a category\n- orphan detail",
+        "3.\n-\n  -  padded  \n",
+        "2 . spaced dot\nplain text\n",
+        "²3. superscript\n- ignored",
+        "①. circled\n³. superscript three",
+        "٣. Arabic-Indic digit\n- kept",
+        "- detail before any category\n1. First\n\r\n- a\r\n",
+    ],
+)
+def test_parse_section_matches_baseline(service, section):
+    assert service.parse_section(section) == _baseline_parse_section(section)
+
+
+def test_structure_output_parses_mock_response(service):
+    structured = service.structure_output(service.generate_mock_response())
+    assert structured["summary"]["totalDataPoints"] == 4
+    assert structured["categories"][0]["category"] == "Chief Complaint/Reason for Visit"
@@ -0,0 +1,155 @@
+import asyncio
+
+import pytest
+
+import job_store
+from job_store import JobStore
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(job_store, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def memory_store(monkeypatch, clock):
+    monkeypatch.delenv("REDIS_URL", raising=False)
+    return lambda ttl_seconds=60: JobStore(ttl_seconds=ttl_seconds)
+
+
+def test_set_get_update(memory_store):
+    async def run():
+        store = memory_store()
+        await store.set("job-1", {"status": "processing"})
+        await store.update("job-1", status="completed", transcript="hello")
+        await store.update("missing", status="completed")
+        return await store.get("job-1"), await store.get("missing")
+
+    job, missing = asyncio.run(run())
+    assert job == {"status": "completed", "transcript": "hello"}
+    assert missing is None
+
+
+def test_job_expires_after_ttl(memory_store, clock):
+    async def run():
+        store = memory_store(10)
+        await store.set("job-1", {"status": "processing"})
+        clock.now += 9
+        before = await store.get("job-1")
+        clock.now += 1
+        return before, await store.get("job-1")
+
+    before, after = asyncio.run(run())
+    assert before == {"status": "processing"}
+    assert after is None
+
+
+def test_update_refreshes_expiry(memory_store, clock):
+    async def run():
+        store = memory_store(10)
+        await store.set("job-1", {"status": "processing"})
+        clock.now += 7
+        await store.update("job-1", status="completed")
+        clock.now += 7
+        return await store.get("job-1")
+
+    assert asyncio.run(run()) == {"status": "completed"}
+
+
+def test_set_purges_unpolled_expired_jobs(memory_store, clock):
+    async def run():
+        store = memory_store(10)
+        await store.set("stale", {"status": "completed"})
+        clock.now += 11
+        await store.set("fresh", {"status": "processing"})
+        return store
+
+    store = asyncio.run(run())
+    assert set(store._memory) == {"fresh"}
+    assert set(store._expires_at) == {"fresh"}
+
+
+def test_zero_ttl_expires_immediately(memory_store):
+    async def run():
+        store = memory_store(0)
+        await store.set("job-1", {"status": "processing"})
+        return await store.get("job-1")
+
+    assert asyncio.run(run()) is None
+
+
+@pytest.fixture
+def redis_store(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    import redis.asyncio
+
+    monkeypatch.setattr(
+        redis.asyncio, "from_url", lambda url, **kwargs: fakeredis.FakeAsyncRedis(**kwargs)
+    )
+    return lambda ttl_seconds=60: JobStore(redis_url="redis://test", ttl_seconds=ttl_seconds)
+
+
+def test_redis_set_get_update(redis_store):
+    async def run():
+        store = redis_store(60)
+        await store.set("job-1", {"status": "processing", "progress": [1, 2]})
+        await store.update("job-1", status="completed")
+        job = await store.get("job-1")
+        ttl = await store._redis.ttl(store._key("job-1"))
+        return job, ttl
+
+    job, ttl = asyncio.run(run())
+    assert job == {"status": "completed", "progress": [1, 2]}
+    assert 0 < ttl <= 60
+
+
+def test_redis_set_replaces_previous_fields(redis_store):
+    async def run():
+        store = redis_store()
+        await store.set("job-1", {"status": "processing", "transcript": "old"})
+        await store.set("job-1", {"status": "queued"})
+        return await store.get("job-1")
+
+    assert asyncio.run(run()) == {"status": "queued"}
+
+
+def test_redis_update_refreshes_ttl(redis_store):
+    async def run():
+        store = redis_store(60)
+        await store.set("job-1", {"status": "processing"})
+        await store._redis.expire(store._key("job-1"), 5)
+        await store.update("job-1", status="completed")
+        return await store._redis.ttl(store._key("job-1"))
+
+    assert asyncio.run(run()) > 5
+
+
+def test_redis_update_does_not_recreate_expired_job(redis_store):
+    async def run():
+        store = redis_store()
+        await store.update("gone", status="completed")
+        return await store.get("gone"), await store._redis.exists(store._key("gone"))
+
+    assert asyncio.run(run()) == (None, 0)
+
+
+def test_warns_when_multiple_workers_lack_redis(monkeypatch, capsys):
+    monkeypatch.delenv("REDIS_URL", raising=False)
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    JobStore()
+    assert "REDIS_URL" in capsys.readouterr().out
+
+    monkeypatch.setenv("WEB_CONCURRENCY", "1")
+    JobStore()
+    assert capsys.readouterr().out == ""